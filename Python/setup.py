@@ -183,6 +183,18 @@ tvdenoising_ext = Extension('_tvdenoising',
                             extra_compile_args={'gcc': [],
                                                 'nvcc': compute_capability_args},
                             include_dirs=[numpy_include, CUDA['include'], 'Source'])
+# CPU fallback of tvdenoising. Optional, so a compiler without OpenMP does
+# not stop the rest of TIGRE from building.
+tvdenoising_cpu_ext = Extension('_tvdenoising_cpu',
+                                sources=(
+                                    include_headers(['tigre/Source/tvdenoising_cpu.cpp',
+                                                     'tigre/Source/_tvdenoising_cpu.pyx'], sdist=(sys.argv[1] == "sdist"))),
+                                language='c++',
+                                extra_compile_args={'gcc': ['-O3', '-fopenmp', '-fno-math-errno'],
+                                                    'nvcc': []},
+                                extra_link_args=['-fopenmp'],
+                                include_dirs=[numpy_include, 'tigre/Source'],
+                                optional=True)
 minTV_ext = Extension('_minTV',
                       sources=(include_headers(['tigre/Source/POCS_TV.cu',
                                                 'tigre/Source/_types.pxd',
@@ -227,7 +239,7 @@ setup(name='pytigre',
       packages=find_packages(),
       scripts=['tigre/demos/launch.sh'],
       include_package_data=True,
-      ext_modules=[Ax_ext, Atb_ext, tvdenoising_ext, minTV_ext, AwminTV_ext],
+      ext_modules=[Ax_ext, Atb_ext, tvdenoising_ext, tvdenoising_cpu_ext, minTV_ext, AwminTV_ext],
       py_modules=['tigre.py'],
       # inject our custom trigger
       cmdclass={'build_ext': custom_build_ext},
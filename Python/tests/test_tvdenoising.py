@@ -0,0 +1,182 @@
+import unittest
+from unittest import mock
+import numpy as np
+from tigre.utilities import im_3d_denoise
+from tigre.utilities.im_3d_denoise import im3ddenoise, _tv_chambolle_numpy, _tvdenoise_numpy
+from tigre.utilities.errors import TigreCudaCallError
+try:
+    from skimage.restoration import denoise_tv_chambolle
+except ImportError:
+    denoise_tv_chambolle = None
+
+tv_chambolle_3d = im_3d_denoise.tv_chambolle_3d
+tv_chambolle_3d_warm = im_3d_denoise.tv_chambolle_3d_warm
+tvdenoise_cpu = im_3d_denoise.tvdenoise_cpu
+
+
+def random_volume(shape, seed=0):
+    return np.random.RandomState(seed).rand(*shape).astype(np.float32)
+
+
+def tvdenoise_reference(src, maxiter, lamda):
+    """Line by line transcription of the kernels in tvdenoising.cu."""
+    cols, rows, depth = src.shape
+    size2d = rows * cols
+    f = src.ravel().astype(np.float64)
+    u = f.copy()
+    pz = np.zeros_like(f)
+    py = np.zeros_like(f)
+    px = np.zeros_like(f)
+    for i in range(maxiter):
+        tau2 = 0.3 + 0.02 * i
+        tau1 = (1. / tau2) * ((1. / 6.) - (5. / (15. + i)))
+        for z in range(depth):
+            for y in range(rows):
+                for x in range(cols):
+                    idx = z * size2d + y * cols + x
+                    div = pz[idx] - (pz[idx - size2d] if z > 0 else 0)
+                    div += py[idx] - (py[idx - cols] if y > 0 else 0)
+                    div += px[idx] - (px[idx - 1] if x > 0 else 0)
+                    u[idx] = u[idx] * (1 - tau1) + tau1 * (f[idx] + div / lamda)
+        for z in range(depth):
+            for y in range(rows):
+                for x in range(cols):
+                    idx = z * size2d + y * cols + x
+                    grad = [0., 0., 0.]
+                    if z + 1 < depth:
+                        grad[0] = u[idx + size2d] - u[idx]
+                    if y + 1 < rows:
+                        grad[1] = u[idx + cols] - u[idx]
+                    if x + 1 < cols:
+                        grad[2] = u[idx + 1] - u[idx]
+                    q = [pz[idx] + tau2 * grad[0],
+                         py[idx] + tau2 * grad[1],
+                         px[idx] + tau2 * grad[2]]
+                    norm = max(1., np.sqrt(q[0] ** 2 + q[1] ** 2 + q[2] ** 2))
+                    pz[idx] = q[0] / norm
+                    py[idx] = q[1] / norm
+                    px[idx] = q[2] / norm
+    return u.reshape(src.shape).astype(np.float32)
+
+
+def im3ddenoise_reference(img, maxiter, lamda):
+    imgmin = img.min()
+    imgmax = (img - imgmin).max()
+    return tvdenoise_reference((img - imgmin) / imgmax, maxiter, lamda) * imgmax + imgmin
+
+
+def no_gpu():
+    # tvdenoise raises error 2 (no CUDA device) without a usable GPU
+    return mock.patch.object(im_3d_denoise, 'tvdenoise',
+                             side_effect=TigreCudaCallError('tvdenoising:', 2))
+
+
+class TestTvPrimalDual(unittest.TestCase):
+    """CPU versions of tvdenoising.cu against a transcription of its kernels."""
+
+    shapes = [(6, 5, 4), (1, 5, 7), (7, 1, 5), (5, 7, 1)]
+
+    def test_numpy_matches_reference(self):
+        for shape in self.shapes:
+            img = random_volume(shape)
+            np.testing.assert_allclose(_tvdenoise_numpy(img, 20, 15.),
+                                       tvdenoise_reference(img, 20, 15.),
+                                       atol=1e-5)
+
+    @unittest.skipIf(tvdenoise_cpu is None, '_tvdenoising_cpu was not built')
+    def test_cpu_matches_reference(self):
+        for shape in self.shapes:
+            img = random_volume(shape)
+            np.testing.assert_allclose(tvdenoise_cpu(img, 20, 15.),
+                                       tvdenoise_reference(img, 20, 15.),
+                                       atol=1e-5)
+
+
+class TestTvChambolle(unittest.TestCase):
+    """CPU checks of the Chambolle TV kernels, no GPU needed."""
+
+    def test_numpy_warm_start(self):
+        img = random_volume((8, 9, 10))
+        p = tuple(np.zeros_like(img) for _ in range(3))
+        _tv_chambolle_numpy(img, 15, 0.1, p)
+        warm = _tv_chambolle_numpy(img, 15, 0.1, p)
+        cold = _tv_chambolle_numpy(img, 30, 0.1)
+        np.testing.assert_allclose(warm, cold, atol=1e-5)
+
+    @unittest.skipIf(tv_chambolle_3d is None, 'numba is not installed')
+    def test_numba_matches_numpy(self):
+        for shape in [(16, 16, 16), (1, 5, 7), (7, 1, 5)]:
+            img = random_volume(shape)
+            np.testing.assert_allclose(tv_chambolle_3d(img, 30, 0.1),
+                                       _tv_chambolle_numpy(img, 30, 0.1),
+                                       atol=1e-5)
+
+    @unittest.skipIf(tv_chambolle_3d is None, 'numba is not installed')
+    def test_numba_warm_start(self):
+        img = random_volume((16, 16, 16))
+        p = tuple(np.zeros_like(img) for _ in range(3))
+        tv_chambolle_3d_warm(img, p[0], p[1], p[2], 15, 0.1)
+        warm = tv_chambolle_3d_warm(img, p[0], p[1], p[2], 15, 0.1)
+        np.testing.assert_allclose(warm, tv_chambolle_3d(img, 30, 0.1),
+                                   atol=1e-5)
+
+    @unittest.skipIf(tv_chambolle_3d is None or denoise_tv_chambolle is None,
+                     'numba or scikit-image is not installed')
+    def test_numba_matches_skimage(self):
+        img = random_volume((16, 16, 16))
+        # skimage returns the image before its last dual update
+        ref = denoise_tv_chambolle(img, weight=0.1, eps=0, max_num_iter=31)
+        np.testing.assert_allclose(tv_chambolle_3d(img, 30, 0.1), ref,
+                                   atol=1e-5)
+
+
+class TestIm3dDenoise(unittest.TestCase):
+
+    def test_primaldual_matches_reference(self):
+        # on the GPU, or through the CPU fallback when there is none
+        img = random_volume((6, 5, 4)) * 100
+        np.testing.assert_allclose(im3ddenoise(img, 20, 15.),
+                                   im3ddenoise_reference(img, 20, 15.),
+                                   atol=1e-3)
+
+    def test_no_gpu_fallback(self):
+        img = random_volume((6, 5, 4)) * 100
+        ref = im3ddenoise_reference(img, 20, 15.)
+        with no_gpu():
+            np.testing.assert_allclose(im3ddenoise(img, 20, 15.), ref, atol=1e-3)
+            with mock.patch.object(im_3d_denoise, 'tvdenoise_cpu', None):
+                np.testing.assert_allclose(im3ddenoise(img, 20, 15.), ref, atol=1e-3)
+
+    def test_fortran_order(self):
+        img = random_volume((6, 5, 4)) * 100
+        ref = im3ddenoise_reference(img, 20, 15.)
+        fimg = np.asfortranarray(img)
+        np.testing.assert_allclose(im3ddenoise(fimg, 20, 15.), ref, atol=1e-3)
+        with no_gpu():
+            np.testing.assert_allclose(im3ddenoise(fimg, 20, 15.), ref, atol=1e-3)
+            with mock.patch.object(im_3d_denoise, 'tvdenoise_cpu', None):
+                np.testing.assert_allclose(im3ddenoise(fimg, 20, 15.), ref, atol=1e-3)
+        np.testing.assert_allclose(im3ddenoise(fimg, 20, 15., method='chambolle'),
+                                   im3ddenoise(img, 20, 15., method='chambolle'),
+                                   atol=1e-4)
+
+    def test_out(self):
+        for method in ['primaldual', 'chambolle']:
+            img = random_volume((8, 9, 10)) * 100
+            ref = im3ddenoise(img, 10, 15., method=method)
+            out = np.empty_like(img)
+            res = im3ddenoise(img, 10, 15., out=out, method=method)
+            self.assertIs(res, out)
+            np.testing.assert_allclose(out, ref, atol=1e-4)
+            # in place
+            res = im3ddenoise(img, 10, 15., out=img, method=method)
+            self.assertIs(res, img)
+            np.testing.assert_allclose(img, ref, atol=1e-4)
+
+    def test_unknown_method(self):
+        img = random_volume((4, 4, 4))
+        self.assertRaises(ValueError, im3ddenoise, img, method='fast')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,7 +26,7 @@ cdef extern from "numpy/arrayobject.h":
     void PyArray_CLEARFLAGS(np.ndarray arr, int flags)
 
 cdef extern from "tvdenoising.hpp":
-    cdef void tvdenoising(float* src, float* dst, float lamda, float* spacing, long* image_size, int maxiter)
+    cdef int tvdenoising(float* src, float* dst, float lamda, float* spacing, long* image_size, int maxiter)
 
 
 def cuda_raise_errors(error_code):
@@ -56,7 +56,10 @@ def tvdenoise(np.ndarray[np.float32_t, ndim=3] src, int maxiter = 100, float lam
 
     cdef float* c_src = <float*> src.data
     cdef np.npy_intp c_maxiter = <np.npy_intp> maxiter
-    cuda_raise_errors(tvdenoising(c_src, c_imgout, lamda, spacing, imgsize, c_maxiter))
+    cdef int error_code = tvdenoising(c_src, c_imgout, lamda, spacing, imgsize, c_maxiter)
+    if error_code:
+        free(c_imgout)
+    cuda_raise_errors(error_code)
 
     imgout = np.PyArray_SimpleNewFromData(3, size_img, np.NPY_FLOAT32, c_imgout)
     PyArray_ENABLEFLAGS(imgout, np.NPY_OWNDATA)
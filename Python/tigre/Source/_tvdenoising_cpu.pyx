@@ -0,0 +1,41 @@
+#   This file is part of the TIGRE Toolbox
+
+#   Copyright (c) 2015, University of Bath and
+#                       CERN-European Organization for Nuclear Research
+#                       All rights reserved.
+
+#   License:            Open Source under BSD.
+#                       See the full license at
+#                       https://github.com/CERN/TIGRE/license.txt
+
+#   Contact:            tigre.toolbox@gmail.com
+#   Codes:              https://github.com/CERN/TIGRE/
+# --------------------------------------------------------------------------
+
+cimport numpy as np
+import numpy as np
+np.import_array()
+
+cdef extern from "tvdenoising_cpu.hpp":
+    cdef int tvdenoising_cpu(const float* src, float* dst, float lamda, const float* spacing, const long* image_size, int maxiter)
+
+
+def tvdenoise_cpu(np.ndarray[np.float32_t, ndim=3, mode="c"] src, int maxiter = 100, float lamda = 15.0):
+    """CPU (OpenMP + SIMD) version of _tvdenoising.tvdenoise, same arguments."""
+
+    cdef np.ndarray[np.float32_t, ndim=3, mode="c"] imgout = np.empty_like(src)
+
+    cdef float spacing[3]
+    spacing[0]=<float> 1
+    spacing[1]=<float> 1
+    spacing[2]=<float> 1
+
+    cdef long imgsize[3]
+    imgsize[0] = <long> src.shape[0]
+    imgsize[1] = <long> src.shape[1]
+    imgsize[2] = <long> src.shape[2]
+
+    if tvdenoising_cpu(<float*> src.data, <float*> imgout.data, lamda, spacing, imgsize, maxiter):
+        raise MemoryError('tvdenoising_cpu: could not allocate the dual variables')
+
+    return imgout
@@ -0,0 +1,165 @@
+/*-------------------------------------------------------------------------
+ *
+ * CPU (OpenMP + SIMD) TV image denoising. Same primal-dual iterations and
+ * step sizes as tvdenoising.cu. Rows along x are contiguous, so the inner
+ * loops have no branches and are vectorised with #pragma omp simd.
+ *
+ *
+---------------------------------------------------------------------------
+---------------------------------------------------------------------------
+Copyright (c) 2015, University of Bath and CERN- European Organization for 
+Nuclear Research
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without 
+modification, are permitted provided that the following conditions are met:
+
+1. Redistributions of source code must retain the above copyright notice, 
+this list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright notice, 
+this list of conditions and the following disclaimer in the documentation 
+and/or other materials provided with the distribution.
+
+3. Neither the name of the copyright holder nor the names of its contributors
+may be used to endorse or promote products derived from this software without
+specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" 
+AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE 
+IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE 
+ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE 
+LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR 
+CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF 
+SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS 
+INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN 
+CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+POSSIBILITY OF SUCH DAMAGE.
+ ---------------------------------------------------------------------------
+
+Contact: tigre.toolbox@gmail.com
+Codes  : https://github.com/CERN/TIGRE
+--------------------------------------------------------------------------- 
+ */
+
+#include "tvdenoising_cpu.hpp"
+#include <math.h>
+#include <stdlib.h>
+#include <string.h>
+
+// u = u*(1-tau) + tau*(f + div(p)/lambda)
+static void update_u(const float* f, const float* pz, const float* py, const float* px, float* u,
+        const float* zeros, float tau, float lambda,
+        long depth, long rows, long cols,
+        float dz, float dy, float dx)
+{
+    const long size2d = rows*cols;
+    const float idz = 1.0f/dz, idy = 1.0f/dy, idx_ = 1.0f/dx;
+    const float ilambda = 1.0f/lambda;
+#pragma omp parallel for collapse(2) schedule(static)
+    for (long z = 0; z < depth; z++) {
+        for (long y = 0; y < rows; y++) {
+            const long row = z*size2d + y*cols;
+            // Previous row along z and y. At the first slice/row the
+            // backward difference becomes p itself, same as the GPU code.
+            const float* pz_prev = (z > 0) ? pz + row - size2d : zeros;
+            const float* py_prev = (y > 0) ? py + row - cols   : zeros;
+            const float* pzr = pz + row;
+            const float* pyr = py + row;
+            const float* pxr = px + row;
+            const float* fr  = f  + row;
+            float* ur = u + row;
+            const float scale_z = (z > 0) ? idz : 1.0f;
+            const float scale_y = (y > 0) ? idy : 1.0f;
+
+            // x == 0
+            float div = (pzr[0] - pz_prev[0])*scale_z + (pyr[0] - py_prev[0])*scale_y + pxr[0];
+            ur[0] = ur[0]*(1.0f - tau) + tau*(fr[0] + ilambda*div);
+#pragma omp simd
+            for (long x = 1; x < cols; x++) {
+                float d = (pzr[x] - pz_prev[x])*scale_z
+                        + (pyr[x] - py_prev[x])*scale_y
+                        + (pxr[x] - pxr[x-1])*idx_;
+                ur[x] = ur[x]*(1.0f - tau) + tau*(fr[x] + ilambda*d);
+            }
+        }
+    }
+}
+
+// p = (p + tau*grad(u)) / max(1, |p + tau*grad(u)|)
+static void update_p(const float* u, float* pz, float* py, float* px,
+        float tau, long depth, long rows, long cols,
+        float dz, float dy, float dx)
+{
+    const long size2d = rows*cols;
+    const float tdz = tau/dz, tdy = tau/dy, tdx = tau/dx;
+#pragma omp parallel for collapse(2) schedule(static)
+    for (long z = 0; z < depth; z++) {
+        for (long y = 0; y < rows; y++) {
+            const long row = z*size2d + y*cols;
+            const float* ur = u + row;
+            // Next row along z and y. At the last slice/row it is the row
+            // itself, so the forward difference is 0.
+            const float* uz_next = (z + 1 < depth) ? ur + size2d : ur;
+            const float* uy_next = (y + 1 < rows)  ? ur + cols   : ur;
+            float* pzr = pz + row;
+            float* pyr = py + row;
+            float* pxr = px + row;
+#pragma omp simd
+            for (long x = 0; x < cols - 1; x++) {
+                float qz = pzr[x] + tdz*(uz_next[x] - ur[x]);
+                float qy = pyr[x] + tdy*(uy_next[x] - ur[x]);
+                float qx = pxr[x] + tdx*(ur[x+1] - ur[x]);
+                // max(1, |q|) written without a compare so gcc vectorises it
+                float n = sqrtf(qz*qz + qy*qy + qx*qx);
+                float norm = 0.5f*(1.0f + n + fabsf(1.0f - n));
+                pzr[x] = qz/norm;
+                pyr[x] = qy/norm;
+                pxr[x] = qx/norm;
+            }
+            // x == cols-1, no forward difference along x
+            const long x = cols - 1;
+            float qz = pzr[x] + tdz*(uz_next[x] - ur[x]);
+            float qy = pyr[x] + tdy*(uy_next[x] - ur[x]);
+            float qx = pxr[x];
+            float norm = fmaxf(1.0f, sqrtf(qz*qz + qy*qy + qx*qx));
+            pzr[x] = qz/norm;
+            pyr[x] = qy/norm;
+            pxr[x] = qx/norm;
+        }
+    }
+}
+
+int tvdenoising_cpu(const float* src, float* dst, float lambda,
+        const float* spacing, const long* image_size, int maxIter)
+{
+    // image_size is (cols, rows, depth), as in tvdenoising.cu
+    const long cols  = image_size[0];
+    const long rows  = image_size[1];
+    const long depth = image_size[2];
+    const size_t total = (size_t)cols*rows*depth;
+
+    float* pz    = (float*)calloc(total, sizeof(float));
+    float* py    = (float*)calloc(total, sizeof(float));
+    float* px    = (float*)calloc(total, sizeof(float));
+    float* zeros = (float*)calloc(cols, sizeof(float));
+    if (pz == NULL || py == NULL || px == NULL || zeros == NULL) {
+        free(pz); free(py); free(px); free(zeros);
+        return 1;
+    }
+    memcpy(dst, src, total*sizeof(float));
+
+    float tau2, tau1;
+    for (int i = 0; i < maxIter; i++) {
+        tau2 = 0.3f + 0.02f * i;
+        tau1 = (1.f/tau2) * ((1.f/6.f) - (5.f/(15.f+i)));
+        update_u(src, pz, py, px, dst, zeros, tau1, lambda,
+                depth, rows, cols, spacing[2], spacing[1], spacing[0]);
+        update_p(dst, pz, py, px, tau2,
+                depth, rows, cols, spacing[2], spacing[1], spacing[0]);
+    }
+
+    free(pz); free(py); free(px); free(zeros);
+    return 0;
+}
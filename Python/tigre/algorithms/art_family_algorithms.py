@@ -85,9 +85,9 @@ class OS_SART_TV(IterativeReconAlg):
                 if i == 0:
                     print(str(self.name).upper() +
                           ' ' + "algorithm in progress.")
-                    toc = time.clock()
+                    toc = time.perf_counter()
                 if i == 1:
-                    tic = time.clock()
+                    tic = time.perf_counter()
                     print('Esitmated time until completetion (s): ' +
                           str((self.niter - 1) * (tic - toc)))
             getattr(self, self.dataminimizing)()
@@ -6,7 +6,11 @@ from tigre.algorithms.iterative_recon_alg import decorator
 import time
 from tigre.utilities.im_3d_denoise import im3ddenoise
 from tigre.algorithms.single_pass_algorithms import FDK
-import copy
+import math
+try:
+    from skimage.restoration import denoise_tv_chambolle
+except ImportError:
+    denoise_tv_chambolle = None
 
 
 class FISTA(IterativeReconAlg):
@@ -75,8 +79,23 @@ class FISTA(IterativeReconAlg):
                                     biggest angular distance with the
                                     ones used
     :keyword tviter: (int)
-        Number of iterations of im3ddenoise for every iteration.
-        Default: 20
+        Number of iterations of the TV denoising step for every
+        iteration.
+        Default: 5 with tvwarmstart, 20 otherwise
+
+    :keyword tvdenoiser: (str)
+        Chooses the TV denoising step. Options are:
+                 "im3ddenoise": primal-dual algorithm on the GPU(s)
+                                (default)
+                 "chambolle"  : Chambolle's algorithm on the CPU (numba
+                                if installed)
+                 "skimage"    : skimage.restoration.denoise_tv_chambolle
+
+    :keyword tvwarmstart: (Boolean)
+        Only for tvdenoiser="chambolle". Keeps the dual variables of the
+        TV step between iterations (three extra volumes) and starts
+        from them, so fewer TV iterations are needed.
+        default=False
 
     :keyword lambda: (float)
         Adjustement of lambdaForTV. Default: 0.1
@@ -126,13 +145,42 @@ class FISTA(IterativeReconAlg):
                            ))
         kwargs.update(dict(blocksize=angles.shape[0]))
         IterativeReconAlg.__init__(self, proj, geo, angles, niter, **kwargs)
+        # W and V given as None make the parent skip set_w/set_v, so no
+        # projection or volume sized weights are allocated.
+        assert self.W is None and self.V is None
+        self._dm_fn = getattr(self, self.dataminimizing)
+        # blocksize is the number of angles, so there is a single block
+        # with every angle in order. A slice takes it as a view of proj
+        # in update_image instead of a copy.
+        bounds = np.cumsum([0] + [np.size(block) for block in self.angle_index])
+        self.angle_index = [slice(bounds[j], bounds[j + 1])
+                            for j in range(len(bounds) - 1)]
+        if self.Quameasopts is not None:
+            # previous iterate for error_measurement, refilled every iteration
+            self._res_prev = np.empty_like(self.res)
         self.lmbda = 0.1
         if 'hyper' not in kwargs:
             self.__L__ = 2.e4
         else:
             self.__L__ = kwargs['hyper']
+        if 'tvdenoiser' not in kwargs:
+            self.tvdenoiser = 'im3ddenoise'
+        if self.tvdenoiser not in ('im3ddenoise', 'chambolle', 'skimage'):
+            raise ValueError('Unknown tvdenoiser: ' + str(self.tvdenoiser))
+        if self.tvdenoiser == 'skimage' and denoise_tv_chambolle is None:
+            raise ImportError("tvdenoiser='skimage' requires scikit-image")
+        if 'tvwarmstart' not in kwargs:
+            self.tvwarmstart = False
+        if self.tvwarmstart and self.tvdenoiser != 'chambolle':
+            raise ValueError("tvwarmstart requires tvdenoiser='chambolle'")
+        if self.tvwarmstart:
+            self._tv_dual = tuple(np.zeros(self.res.shape, dtype=np.float32)
+                                  for _ in range(3))
+        else:
+            self._tv_dual = None
+        self._tv_method = 'chambolle' if self.tvdenoiser == 'chambolle' else 'primaldual'
         if 'tviter' not in kwargs:
-            self.__numiter_tv__ = 20
+            self.__numiter_tv__ = 20 if self._tv_dual is None else 5
         else:
             self.__numiter_tv__ = kwargs['tviter']
         if 'lambda' not in kwargs:
@@ -141,6 +189,38 @@ class FISTA(IterativeReconAlg):
             self.__lambda__ = kwargs['lambda']
         self.__t__ = 1
         self.__bm__ = 1. / self.__L__
+        self._two_bm = 2. * self.__bm__
+        # lambda passed to the TV step, 1 / lambdaForTv
+        self._tv_weight = 1. / (2 * self.__bm__ * self.__lambda__)
+
+    def _tv_prox(self, vol, lmbda, out=None):
+        """
+        TV proximal step of the algorithm.
+
+        :param vol: (np.ndarray, dtype=np.float32)
+            volume to be denoised
+        :param lmbda: (float)
+            data fidelity parameter, with the same meaning as in
+            im3ddenoise (bigger means less denoising).
+        :param out: (np.ndarray, dtype=np.float32)
+            optional preallocated volume the result is written into.
+        :return: (np.ndarray, dtype=np.float32)
+        """
+        if self.tvdenoiser != 'skimage':
+            return im3ddenoise(vol, self.__numiter_tv__, lmbda, out=out,
+                               method=self._tv_method, p=self._tv_dual)
+        # im3ddenoise works on the image normalised to [0,1], so the
+        # Chambolle weight is scaled back to the dynamic range of vol.
+        weight = np.ptp(vol) / lmbda
+        if weight == 0:
+            denoised = vol
+        else:
+            denoised = denoise_tv_chambolle(vol, weight=weight,
+                                            max_num_iter=self.__numiter_tv__)
+        if out is None:
+            return denoised.astype(np.float32)
+        np.copyto(out, denoised)
+        return out
 
     # overide update_image from iterative recon alg to remove W.
     def update_image(self, geo, angle, iteration):
@@ -155,8 +235,13 @@ class FISTA(IterativeReconAlg):
 
         :return: None
         """
-        self.res += self.__bm__ * 2 * tigre.Atb((self.proj[self.angle_index[iteration]] - tigre.Ax(
-            self.res, geo, angle, 'interpolated')), geo, angle, 'matched')
+        proj_err = tigre.Ax(self.res, geo, angle, 'interpolated')
+        # Ax returns a new array, so the residual is stored in it.
+        np.subtract(self.proj[self.angle_index[iteration]], proj_err, out=proj_err)
+        # Atb is linear, so the step is applied to the (smaller) projections
+        # instead of scaling the backprojected volume.
+        proj_err *= self._two_bm
+        self.res += tigre.Atb(proj_err, geo, angle, 'matched')
 
     def run_main_iter(self):
         """
@@ -165,31 +250,34 @@ class FISTA(IterativeReconAlg):
         """
         t = self.__t__
         Quameasopts = self.Quameasopts
-        x_rec = copy.deepcopy(self.res)
-        lambdaForTv = 2 * self.__bm__ * self.__lambda__
+        x_rec = self.res.copy()
+        x_rec_old = np.empty_like(x_rec)
+        if self.verbose:
+            print(str(self.name).upper() +
+                  ' ' + "algorithm in progress.")
+            toc = time.perf_counter()
         for i in range(self.niter):
 
             res_prev = None
             if Quameasopts is not None:
-                res_prev = copy.deepcopy(self.res)
-            if self.verbose:
-                if i == 0:
-                    print(str(self.name).upper() +
-                          ' ' + "algorithm in progress.")
-                    toc = time.clock()
-                if i == 1:
-                    tic = time.clock()
-                    print('Esitmated time until completetion (s): ' +
-                          str((self.niter - 1) * (tic - toc)))
-            getattr(self, self.dataminimizing)()
-
-            x_rec_old = copy.deepcopy(x_rec)
-            x_rec = im3ddenoise(self.res, self.__numiter_tv__, 1. / lambdaForTv)
+                res_prev = self._res_prev
+                np.copyto(res_prev, self.res)
+            self._dm_fn()
+
+            x_rec, x_rec_old = x_rec_old, x_rec
+            self._tv_prox(self.res, self._tv_weight, out=x_rec)
             t_old = t
-            t = (1 + np.sqrt(1 + 4 * t ** 2)) / 2
-            self.res = x_rec + (t_old - 1) / t * (x_rec - x_rec_old)
+            t = (1 + math.sqrt(1 + 4 * t ** 2)) / 2
+            # self.res = x_rec + (t_old - 1) / t * (x_rec - x_rec_old),
+            # computed in place to avoid two volume sized temporaries.
+            np.subtract(x_rec, x_rec_old, out=self.res)
+            self.res *= (t_old - 1) / t
+            self.res += x_rec
 
             self.error_measurement(res_prev, i)
+            if self.verbose and i == 0 and self.niter > 1:
+                print('Esitmated time until completetion (s): ' +
+                      str((self.niter - 1) * (time.perf_counter() - toc)))
 
 
 fista = decorator(FISTA, name='FISTA')
@@ -207,26 +295,25 @@ class ISTA(FISTA):
         :return: None
         """
         Quameasopts = self.Quameasopts
-        lambdaForTv = 2 * self.__bm__ * self.lmbda
+        tv_weight = 1. / (2 * self.__bm__ * self.lmbda)
+        if self.verbose:
+            print(str(self.name).upper() +
+                  ' ' + "algorithm in progress.")
+            toc = time.perf_counter()
         for i in range(self.niter):
 
             res_prev = None
             if Quameasopts is not None:
-                res_prev = copy.deepcopy(self.res)
-            if self.verbose:
-                if i == 0:
-                    print(str(self.name).upper() +
-                          ' ' + "algorithm in progress.")
-                    toc = time.clock()
-                if i == 1:
-                    tic = time.clock()
-                    print('Esitmated time until completetion (s): ' +
-                          str((self.niter - 1) * (tic - toc)))
-            getattr(self, self.dataminimizing)()
-
-            self.res = im3ddenoise(self.res, 20, 1. / lambdaForTv)
+                res_prev = self._res_prev
+                np.copyto(res_prev, self.res)
+            self._dm_fn()
+
+            self.res = self._tv_prox(self.res, tv_weight)
 
             self.error_measurement(res_prev, i)
+            if self.verbose and i == 0 and self.niter > 1:
+                print('Esitmated time until completetion (s): ' +
+                      str((self.niter - 1) * (time.perf_counter() - toc)))
 
 
 ista = decorator(ISTA, name='ISTA')
@@ -146,6 +146,8 @@ class IterativeReconAlg(object):
             'delta',
             'regularisation',
             'tviter',
+            'tvdenoiser',
+            'tvwarmstart',
             'tvlambda',
             'hyper']
         self.__dict__.update(options)
@@ -291,9 +293,9 @@ class IterativeReconAlg(object):
                 if i == 0:
                     print(str(self.name).upper() +
                           ' ' + "algorithm in progress.")
-                    toc = time.clock()
+                    toc = time.perf_counter()
                 if i == 1:
-                    tic = time.clock()
+                    tic = time.perf_counter()
                     print('Esitmated time until completetion (s): ' +
                           str((self.niter - 1) * (tic - toc)))
             getattr(self, self.dataminimizing)()
@@ -5,8 +5,6 @@ def Atb(projections, geo, angles,  krylov="matched"):
 
     if projections.dtype != np.float32:
         raise TypeError("Input data should be float32, not " + str(projections.dtype))
-    if not np.isreal(projections).all():
-        raise ValueError("Complex types not compatible for back projection.")
     geox = copy.deepcopy(geo)
     geox.check_geo(angles)
     """
@@ -6,8 +6,6 @@ def Ax(img, geo, angles,  krylov="ray-voxel"):
 
     if img.dtype != np.float32:
         raise TypeError("Input data should be float32, not "+ str(img.dtype))
-    if not np.isreal(img).all():
-        raise ValueError("Complex types not compatible for projection.")
     geox = copy.deepcopy(geo)
     geox.check_geo(angles)
     """
@@ -1,15 +1,166 @@
 import numpy as np
 from _tvdenoising import tvdenoise
+from tigre.utilities.errors import TigreCudaCallError
+try:
+    from _tvdenoising_cpu import tvdenoise_cpu
+except ImportError:
+    tvdenoise_cpu = None
+try:
+    from tigre.utilities.im_3d_denoise_numba import tv_chambolle_3d, tv_chambolle_3d_warm
+except ImportError:
+    tv_chambolle_3d = None
+    tv_chambolle_3d_warm = None
 
-def im3ddenoise(img,iter=50,lmbda=15.0):
+def _divergence(pz, py, px, u0, u):
+    # u = u0 + div(p), written into u
+    np.add(pz, py, out=u)
+    np.add(u, px, out=u)
+    np.subtract(u0, u, out=u)
+    u[1:, :, :] += pz[:-1, :, :]
+    u[:, 1:, :] += py[:, :-1, :]
+    u[:, :, 1:] += px[:, :, :-1]
+
+
+def _tv_chambolle_numpy(u0, niter, tau, p=None):
+    """
+    NumPy version of im_3d_denoise_numba.tv_chambolle_3d(_warm), used by
+    im3ddenoise(method='chambolle') when numba is not installed. The
+    work volumes are allocated once and every ufunc writes through out=,
+    so the iterations themselves allocate nothing.
+    """
+    if p is None:
+        p = tuple(np.zeros_like(u0) for _ in range(3))
+    pz, py, px = p
+    u = np.empty_like(u0)
+    gz = np.zeros_like(u0)
+    gy = np.zeros_like(u0)
+    gx = np.zeros_like(u0)
+    norm = np.empty_like(u0)
+    step = 1. / 6.
+
+    _divergence(pz, py, px, u0, u)
+    for _ in range(niter):
+        # forward differences, the last row of each g stays 0
+        np.subtract(u[1:, :, :], u[:-1, :, :], out=gz[:-1, :, :])
+        np.subtract(u[:, 1:, :], u[:, :-1, :], out=gy[:, :-1, :])
+        np.subtract(u[:, :, 1:], u[:, :, :-1], out=gx[:, :, :-1])
+        np.hypot(gz, gy, out=norm)
+        np.hypot(norm, gx, out=norm)
+        norm *= step / tau
+        norm += 1
+        for pk, gk in ((pz, gz), (py, gy), (px, gx)):
+            gk *= step
+            np.subtract(pk, gk, out=pk)
+            np.divide(pk, norm, out=pk)
+        _divergence(pz, py, px, u0, u)
+    return u
+
+
+def _tvdenoise_numpy(src, maxiter=100, lamda=15.0):
+    """
+    NumPy port of the primal-dual iterations of tvdenoising.cu (and
+    tvdenoising_cpu.cpp), used when there is no usable GPU and the
+    _tvdenoising_cpu extension was not built. Same arguments as
+    _tvdenoising.tvdenoise.
+    """
+    # tvdenoising.cu reads src.shape as (cols, rows, depth) of the C
+    # ordered buffer, so the buffer is viewed with the shape reversed.
+    f = np.ascontiguousarray(src, dtype=np.float32).reshape(src.shape[::-1])
+    u = f.copy()
+    pz = np.zeros_like(f)
+    py = np.zeros_like(f)
+    px = np.zeros_like(f)
+    div = np.empty_like(f)
+    # the last slice/row/column of each gradient stays 0
+    gz = np.zeros_like(f)
+    gy = np.zeros_like(f)
+    gx = np.zeros_like(f)
+    norm = np.empty_like(f)
+
+    for i in range(maxiter):
+        tau2 = np.float32(0.3 + 0.02 * i)
+        tau1 = np.float32((1. / tau2) * ((1. / 6.) - (5. / (15. + i))))
+        # div(p), backward differences that are p itself at the first
+        # slice/row/column
+        np.add(pz, py, out=div)
+        div += px
+        div[1:, :, :] -= pz[:-1, :, :]
+        div[:, 1:, :] -= py[:, :-1, :]
+        div[:, :, 1:] -= px[:, :, :-1]
+        # u = u*(1-tau1) + tau1*(f + div/lambda)
+        div *= np.float32(1. / lamda)
+        div += f
+        div *= tau1
+        u *= 1 - tau1
+        u += div
+        # p = (p + tau2*grad(u)) / max(1, |p + tau2*grad(u)|)
+        np.subtract(u[1:, :, :], u[:-1, :, :], out=gz[:-1, :, :])
+        np.subtract(u[:, 1:, :], u[:, :-1, :], out=gy[:, :-1, :])
+        np.subtract(u[:, :, 1:], u[:, :, :-1], out=gx[:, :, :-1])
+        for pk, gk in ((pz, gz), (py, gy), (px, gx)):
+            gk *= tau2
+            pk += gk
+        np.hypot(pz, py, out=norm)
+        np.hypot(norm, px, out=norm)
+        np.maximum(norm, 1, out=norm)
+        pz /= norm
+        py /= norm
+        px /= norm
+    return u.reshape(src.shape)
+
+
+def im3ddenoise(img,iter=50,lmbda=15.0,out=None,method='primaldual',p=None):
+    """
+    TV denoising of a 3D image, normalised to [0,1] internally.
+
+    :param img: (np.ndarray, dtype=np.float32)
+        image to be denoised
+    :param iter: (int)
+        number of iterations
+    :param lmbda: (float)
+        data fidelity parameter, bigger means less denoising
+    :param out: (np.ndarray, dtype=np.float32)
+        optional preallocated volume the result is written into
+    :param method: (str)
+        "primaldual": primal-dual algorithm of tvdenoising.cu, on the
+                      GPU(s) (default)
+        "chambolle" : Chambolle's projection algorithm with weight
+                      1/lmbda, on the CPU (numba if installed)
+    :param p: (tuple of np.ndarray)
+        only for "chambolle": dual variables (pz, py, px) of a previous
+        call to warm start from, updated in place
+    :return: (np.ndarray, dtype=np.float32)
+    """
+    if method not in ('primaldual', 'chambolle'):
+        raise ValueError('Unknown TV denoising method: ' + str(method))
     imgmin = np.amin(img.ravel())
     img = img-imgmin
     imgmax = np.amax(img.ravel())
-    img = img/imgmax
+    # every denoiser below reads the buffer as C ordered
+    img = np.ascontiguousarray(img/imgmax)
 
-    img = tvdenoise(img,iter,lmbda)
+    if method == 'chambolle':
+        if tv_chambolle_3d is None:
+            img = _tv_chambolle_numpy(img, iter, 1./lmbda, p)
+        elif p is None:
+            img = tv_chambolle_3d(img, iter, 1./lmbda)
+        else:
+            img = tv_chambolle_3d_warm(img, p[0], p[1], p[2], iter, 1./lmbda)
+    else:
+        try:
+            img = tvdenoise(img,iter,lmbda)
+        except TigreCudaCallError:
+            # No usable GPU: same algorithm on the CPU, compiled if it was
+            # built, otherwise in plain NumPy.
+            if tvdenoise_cpu is not None:
+                img = tvdenoise_cpu(img,iter,lmbda)
+            else:
+                img = _tvdenoise_numpy(img,iter,lmbda)
 
-    img*=imgmax
-    img+=imgmin
+    # out may be a preallocated volume to write the result into.
+    if out is None:
+        out = img
+    np.multiply(img,imgmax,out=out)
+    out+=imgmin
 
-    return img
\ No newline at end of file
+    return out
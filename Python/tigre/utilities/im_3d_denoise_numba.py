@@ -0,0 +1,96 @@
+from __future__ import division
+import numba as nb
+import numpy as np
+
+
+@nb.njit(cache=True)
+def tv_chambolle_3d(u0, niter, tau):
+    """
+    Chambolle's projection algorithm for TV denoising of a 3D image,
+    written as explicit loops so no temporary volumes are allocated
+    inside the iterations. Each pass is split across threads over the
+    (z, y) rows of the volume.
+
+    :param u0: (np.ndarray, dtype=np.float32)
+        image to be denoised, shape = (nz, ny, nx)
+    :param niter: (int)
+        number of iterations
+    :param tau: (float)
+        TV weight, bigger means more denoising.
+    :return: (np.ndarray, dtype=np.float32)
+    """
+    pz = np.zeros_like(u0)
+    py = np.zeros_like(u0)
+    px = np.zeros_like(u0)
+    return tv_chambolle_3d_warm(u0, pz, py, px, niter, tau)
+
+
+@nb.njit(parallel=True, fastmath=True, cache=True)
+def tv_chambolle_3d_warm(u0, pz, py, px, niter, tau):
+    """
+    Same as tv_chambolle_3d, but starting from the dual variables
+    (pz, py, px) of a previous call, which are updated in place. When
+    u0 changes little between calls, a few iterations are enough.
+
+    :param u0: (np.ndarray, dtype=np.float32)
+        image to be denoised, shape = (nz, ny, nx)
+    :param pz, py, px: (np.ndarray, dtype=np.float32)
+        dual variables, same shape as u0
+    :param niter: (int)
+        number of iterations
+    :param tau: (float)
+        TV weight, bigger means more denoising.
+    :return: (np.ndarray, dtype=np.float32)
+    """
+    nz, ny, nx = u0.shape
+    u = np.empty_like(u0)
+    # u = u0 + div(p) for the initial dual
+    for ij in nb.prange(nz * ny):
+        i = ij // ny
+        j = ij % ny
+        for k in range(nx):
+            d = -(pz[i, j, k] + py[i, j, k] + px[i, j, k])
+            if i > 0:
+                d += pz[i - 1, j, k]
+            if j > 0:
+                d += py[i, j - 1, k]
+            if k > 0:
+                d += px[i, j, k - 1]
+            u[i, j, k] = u0[i, j, k] + d
+    step = np.float32(1. / 6.)
+    scale = np.float32(step / tau)
+    zero = np.float32(0.)
+    for it in range(niter):
+        # gradient of u, its magnitude and the projection of p
+        for ij in nb.prange(nz * ny):
+            i = ij // ny
+            j = ij % ny
+            for k in range(nx):
+                uc = u[i, j, k]
+                gz = zero
+                gy = zero
+                gx = zero
+                if i < nz - 1:
+                    gz = u[i + 1, j, k] - uc
+                if j < ny - 1:
+                    gy = u[i, j + 1, k] - uc
+                if k < nx - 1:
+                    gx = u[i, j, k + 1] - uc
+                norm = 1 + scale * np.sqrt(gz * gz + gy * gy + gx * gx)
+                pz[i, j, k] = (pz[i, j, k] - step * gz) / norm
+                py[i, j, k] = (py[i, j, k] - step * gy) / norm
+                px[i, j, k] = (px[i, j, k] - step * gx) / norm
+        # u = u0 + div(p)
+        for ij in nb.prange(nz * ny):
+            i = ij // ny
+            j = ij % ny
+            for k in range(nx):
+                d = -(pz[i, j, k] + py[i, j, k] + px[i, j, k])
+                if i > 0:
+                    d += pz[i - 1, j, k]
+                if j > 0:
+                    d += py[i, j - 1, k]
+                if k > 0:
+                    d += px[i, j, k - 1]
+                u[i, j, k] = u0[i, j, k] + d
+    return u